@@ -91,48 +91,48 @@ def rgb_to_color_name(r, g, b) -> str:
     return RGB_TO_COLOR_NAME.get((r, g, b), (r, g, b))
 
 
+CHUNK_TYPES = {
+    0x0004: OldPaleteChunk_0x0004,
+    0x0011: OldPaleteChunk_0x0011,
+    0x2005: CelChunk,
+    0x2006: CelExtraChunk,
+    0x2016: MaskChunk,
+    0x2017: PathChunk,
+    0x2018: FrameTagsChunk,
+    0x2019: PaletteChunk,
+    0x2020: UserDataChunk,
+    0x2022: SliceChunk,
+}
+LAYER_CHUNK_TYPE = 0x2004
+
+
 def parse_data(data):
     head = Header(data)
     data_offset = Header.header_size
     frames = []
     layer_index = 0
+    unpack_chunk_header = Chunk.chunk_struct.unpack_from
     for i in range(head.num_frames):
         frame = Frame(data, data_offset)
         frames.append(frame)
         frame.chunks = []
         data_offset += frame.frame_size
         for c in range(frame.num_chunks):
-            chunk = Chunk(data, data_offset)
-            if chunk.chunk_type == 0x2004:
+            chunk_size, chunk_type = unpack_chunk_header(data, data_offset)
+            if chunk_type == LAYER_CHUNK_TYPE:
                 layer = LayerChunk(data, layer_index, data_offset)
                 if layer.layer_type & 1 == 1:
                     frame.chunks.append(LayerGroupChunk(layer))
                 else:
                     frame.chunks.append(layer)
                 layer_index += 1
-            elif chunk.chunk_type == 0x2005:
-                frame.chunks.append(CelChunk(data, data_offset))
-            elif chunk.chunk_type == 0x2006:
-                frame.chunks.append(CelExtraChunk(data, data_offset))
-            elif chunk.chunk_type == 0x2016:
-                frame.chunks.append(MaskChunk(data, data_offset))
-            elif chunk.chunk_type == 0x0004:
-                frame.chunks.append(OldPaleteChunk_0x0004(data, data_offset))
-            elif chunk.chunk_type == 0x0011:
-                frame.chunks.append(OldPaleteChunk_0x0011(data, data_offset))
-            elif chunk.chunk_type == 0x2017:
-                frame.chunks.append(PathChunk(data, data_offset))
-            elif chunk.chunk_type == 0x2018:
-                frame.chunks.append(FrameTagsChunk(data, data_offset))
-            elif chunk.chunk_type == 0x2019:
-                frame.chunks.append(PaletteChunk(data, data_offset))
-            elif chunk.chunk_type == 0x2020:
-                frame.chunks.append(UserDataChunk(data, data_offset))
-            elif chunk.chunk_type == 0x2022:
-                frame.chunks.append(SliceChunk(data, data_offset))
-            # else:
-            #     print("Skipped 0x{:04x}".format(chunk.chunk_type))
-
-            data_offset += chunk.chunk_size
+            else:
+                chunk_class = CHUNK_TYPES.get(chunk_type)
+                if chunk_class is not None:
+                    frame.chunks.append(chunk_class(data, data_offset))
+                # else:
+                #     print("Skipped 0x{:04x}".format(chunk_type))
+
+            data_offset += chunk_size
 
     return head, frames
@@ -3,83 +3,69 @@ import zlib
 import math
 
 
+# Structs are compiled once here rather than per chunk, since files have many chunks.
+UINT16_STRUCT = Struct("<H")
+UINT32_STRUCT = Struct("<I")
+RGB_STRUCT = Struct("<BBB")
+RGBA_STRUCT = Struct("<BBBB")
+
+
 # They're not 0-terminated strings, but they're prefixed with their size
 def parse_string(data, string_offset):
-    (string_length,) = Struct("<H").unpack_from(data, string_offset)
-
-    (string_name,) = Struct("<{}s".format(string_length)).unpack_from(
-        data, string_offset + 2
-    )
+    (string_length,) = UINT16_STRUCT.unpack_from(data, string_offset)
+    string_start = string_offset + 2
+    string_name = bytes(data[string_start : string_start + string_length])
     return string_length + 2, string_name.decode("utf-8")
 
 
 class Chunk(object):
     chunk_format = "<IH"
+    chunk_struct = Struct(chunk_format)
 
     def __init__(self, data, data_offset=0):
-        chunk_struct = Struct(Chunk.chunk_format)
-        (self.chunk_size, self.chunk_type) = chunk_struct.unpack_from(data, data_offset)
+        (self.chunk_size, self.chunk_type) = Chunk.chunk_struct.unpack_from(
+            data, data_offset
+        )
 
 
 class OldPaleteChunk_0x0004(Chunk):
+    packet_struct = Struct("<BB")
+
     def __init__(self, data, data_offset=0):
         Chunk.__init__(self, data, data_offset)
 
-        packet_struct = Struct("<BB")
-        color_packet_struct = Struct("<BBB")
-
-        (self.num_packets,) = Struct("<H").unpack_from(data, data_offset + 6)
+        (self.num_packets,) = UINT16_STRUCT.unpack_from(data, data_offset + 6)
         self.packets = []
 
         packet_offset = data_offset + 8
         for packet_index in range(self.num_packets):
             packet = {"colors": []}
-            (packet["previous_packet_skip"], num_colors) = packet_struct.unpack_from(
-                data, packet_offset
-            )
+            (
+                packet["previous_packet_skip"],
+                num_colors,
+            ) = OldPaleteChunk_0x0004.packet_struct.unpack_from(data, packet_offset)
             packet_offset += 2
-            for color in range(0, num_colors):
-                (red, blue, green) = color_packet_struct.unpack_from(
-                    data, packet_offset
-                )
-                packet["colors"].append([red, blue, green])
-                packet_offset += 3
+            colors_end = packet_offset + 3 * num_colors
+            packet["colors"] = [
+                list(color)
+                for color in RGB_STRUCT.iter_unpack(data[packet_offset:colors_end])
+            ]
+            packet_offset = colors_end
 
             self.packets.append(packet)
 
 
-class OldPaleteChunk_0x0011(Chunk):
-    def __init__(self, data, data_offset=0):
-        Chunk.__init__(self, data, data_offset)
-
-        packet_struct = Struct("<BB")
-        color_packet_struct = Struct("<BBB")
-        self.num_packets = Struct("<H").unpack_from(data, data_offset)
-        self.packets = []
-
-        packet_offset = data_offset + 6
-        for packet_index in range(self.num_packets):
-            packet = {"colors": []}
-            (packet.previous_packet_skip, num_colors) = packet_struct.unpack_from(
-                data, packet_offset
-            )
-            packet_offset += 2
-            for color in range(0, num_colors):
-                (red, blue, green) = color_packet_struct.unpack_from(
-                    data, packet_offset
-                )
-                packet["colors"].append([red, blue, green])
-                packet_offset += 3
-
-            self.packets.append(packet)
+class OldPaleteChunk_0x0011(OldPaleteChunk_0x0004):
+    """Same layout as 0x0004, but color values range from 0 to 63."""
 
 
 class LayerChunk(Chunk):
     layer_format = "<HHHHHHB3x"
+    layer_struct = Struct(layer_format)
 
     def __init__(self, data, layer_index, data_offset=0):
         Chunk.__init__(self, data, data_offset)
-        layer_struct = Struct(LayerChunk.layer_format)
+        layer_struct = LayerChunk.layer_struct
         (
             self.flags,
             self.layer_type,
@@ -114,10 +100,12 @@ class LayerGroupChunk(LayerChunk):
 class CelChunk(Chunk):
     cel_format = "<HhhBH7x"
     cel_type_format = "<HH"
+    cel_struct = Struct(cel_format)
+    cel_type_struct = Struct(cel_type_format)
 
     def __init__(self, data, data_offset=0):
         Chunk.__init__(self, data, data_offset)
-        cel_struct = Struct(CelChunk.cel_format)
+        cel_struct = CelChunk.cel_struct
         (
             self.layer_index,
             self.x_pos,
@@ -126,7 +114,7 @@ class CelChunk(Chunk):
             self.cel_type,
         ) = cel_struct.unpack_from(data, data_offset + 6)
         cel_offset = data_offset + cel_struct.size + 6
-        cel_struct = Struct(CelChunk.cel_type_format)
+        cel_struct = CelChunk.cel_type_struct
         if self.cel_type == 0:
             self.data = {}
             (self.data["width"], self.data["height"]) = cel_struct.unpack_from(
@@ -134,9 +122,9 @@ class CelChunk(Chunk):
             )
             start_range = cel_offset + cel_struct.size
             end_range = data_offset + self.chunk_size
-            self.data["data"] = data[start_range:end_range]
+            self.data["data"] = bytes(data[start_range:end_range])
         elif self.cel_type == 1:
-            self.data = {"link": Struct("<H").unpack_from(data, cel_offset)}
+            self.data = {"link": UINT16_STRUCT.unpack_from(data, cel_offset)}
         elif self.cel_type == 2:
             self.data = {}
             (self.data["width"], self.data["height"]) = cel_struct.unpack_from(
@@ -149,10 +137,11 @@ class CelChunk(Chunk):
 
 class CelExtraChunk(Chunk):
     celextra_format = "<HLLLL16x"
+    celextra_struct = Struct(celextra_format)
 
     def __init__(self, data, data_offset=0):
         Chunk.__init__(self, data, data_offset)
-        cel_struct = Struct(CelExtraChunk.celextra_format)
+        cel_struct = CelExtraChunk.celextra_struct
         (
             self.flags,
             self.precise_x_pos,
@@ -164,10 +153,11 @@ class CelExtraChunk(Chunk):
 
 class MaskChunk(Chunk):
     mask_format = "<hhHH8x"
+    mask_struct = Struct(mask_format)
 
     def __init__(self, data, data_offset=0):
         Chunk.__init__(self, data, data_offset)
-        mask_struct = Struct(MaskChunk.mask_format)
+        mask_struct = MaskChunk.mask_struct
         (self.x_pos, self.y_pos, self.width, self.height) = mask_struct.unpack_from(
             data, data_offset + 6
         )
@@ -177,7 +167,7 @@ class MaskChunk(Chunk):
 
         start_range = name_offset + string_size
         end_range = start_range + math.ceil(self.height * ((self.width + 7) / 8))
-        self.bitmap = data[start_range:start_range:end_range]
+        self.bitmap = bytes(data[start_range:start_range:end_range])
 
 
 class PathChunk(Chunk):
@@ -187,16 +177,18 @@ class PathChunk(Chunk):
 class FrameTagsChunk(Chunk):
     frametag_head_format = "<H8x"
     frametag_format = "<HHB8x3Bx"
+    frametag_head_struct = Struct(frametag_head_format)
+    frametag_struct = Struct(frametag_format)
 
     def __init__(self, data, data_offset=0):
         Chunk.__init__(self, data, data_offset)
-        palette_struct = Struct(FrameTagsChunk.frametag_head_format)
+        palette_struct = FrameTagsChunk.frametag_head_struct
         (num_tags,) = palette_struct.unpack_from(data, data_offset + 6)
 
         self.tags = []
         tag_offset = data_offset + palette_struct.size + 6
 
-        palette_tag_struct = Struct(FrameTagsChunk.frametag_format)
+        palette_tag_struct = FrameTagsChunk.frametag_struct
         for index in range(num_tags):
             tag = {"color": {}}
             (
@@ -215,30 +207,33 @@ class FrameTagsChunk(Chunk):
 
 class PaletteChunk(Chunk):
     palette_format = "<III8x"
+    palette_struct = Struct(palette_format)
+    color_struct = Struct("<HBBBB")
 
     def __init__(self, data, data_offset=0):
         Chunk.__init__(self, data, data_offset)
-        palette_struct = Struct(PaletteChunk.palette_format)
         (
             self.palette_size,
             self.first_color_index,
             self.last_color_index,
-        ) = palette_struct.unpack_from(data, data_offset + 6)
-        color_struct = Struct("<HBBBB")
+        ) = PaletteChunk.palette_struct.unpack_from(data, data_offset + 6)
+        unpack_color = PaletteChunk.color_struct.unpack_from
+        color_size = PaletteChunk.color_struct.size
         self.colors = []
 
-        color_offset = data_offset + 6 + palette_struct.size
+        color_offset = data_offset + 6 + PaletteChunk.palette_struct.size
         for index in range(self.first_color_index, self.last_color_index + 1):
-            color = {"name": None}
-            (
-                color["flags"],
-                color["red"],
-                color["blue"],
-                color["green"],
-                color["alpha"],
-            ) = color_struct.unpack_from(data, color_offset)
-            color_offset += color_struct.size
-            if color["flags"] & 1 != 0:
+            flags, red, blue, green, alpha = unpack_color(data, color_offset)
+            color = {
+                "name": None,
+                "flags": flags,
+                "red": red,
+                "blue": blue,
+                "green": green,
+                "alpha": alpha,
+            }
+            color_offset += color_size
+            if flags & 1 != 0:
                 string_size, color["name"] = parse_string(data, color_offset)
                 color_offset += string_size
 
@@ -249,13 +244,13 @@ class UserDataChunk(Chunk):
     def __init__(self, data, data_offset=0):
         Chunk.__init__(self, data, data_offset)
         userdata_offset = data_offset + 6
-        (self.flags,) = Struct("<I").unpack_from(data, userdata_offset)
+        (self.flags,) = UINT32_STRUCT.unpack_from(data, userdata_offset)
         userdata_offset += 4
         if self.flags & 1 != 0:
             string_size, self.string = parse_string(data, userdata_offset)
             userdata_offset += string_size
         if self.flags & 2 != 0:
-            (self.red, self.green, self.blue, self.alpha) = Struct("<BBBB").unpack_from(
+            (self.red, self.green, self.blue, self.alpha) = RGBA_STRUCT.unpack_from(
                 data, userdata_offset
             )
 
@@ -266,12 +261,16 @@ class SliceChunk(Chunk):
     slice_key_format = "<IiiII"
     slice_bit_1_format = "<iiII"
     slice_bit_2_format = "<ii"
+    slice_chunk_struct = Struct(slice_chunk_format)
+    slice_struct = Struct(slice_format)
+    slice_bit_1_struct = Struct(slice_bit_1_format)
+    slice_bit_2_struct = Struct(slice_bit_2_format)
 
     def __init__(self, data, data_offset=0):
         Chunk.__init__(self, data, data_offset)
         slice_offset = data_offset + 6
 
-        slice_chunk_struct = Struct(SliceChunk.slice_chunk_format)
+        slice_chunk_struct = SliceChunk.slice_chunk_struct
         num_slices, self.flags, self.reserved = slice_chunk_struct.unpack_from(
             data, slice_offset
         )
@@ -283,7 +282,7 @@ class SliceChunk(Chunk):
         self.slices = []
 
         for i in range(num_slices):
-            slice_struct = Struct(SliceChunk.slice_format)
+            slice_struct = SliceChunk.slice_struct
             slice = {}
             (
                 slice["start_frame"],
@@ -294,7 +293,7 @@ class SliceChunk(Chunk):
             ) = slice_struct.unpack_from(data, slice_offset)
             slice_offset += slice_struct.size
             if self.flags & 1 != 0:
-                slice_bit_1_struct = Struct(SliceChunk.slice_bit_1_format)
+                slice_bit_1_struct = SliceChunk.slice_bit_1_struct
                 slice["center"] = {}
                 (
                     slice["center"]["x"],
@@ -304,7 +303,7 @@ class SliceChunk(Chunk):
                 ) = slice_bit_1_struct.unpack_from(data, slice_offset)
                 slice_offset += slice_bit_1_struct.size
             if self.flags & 2 != 0:
-                slice_bit_2_struct = Struct(SliceChunk.slice_bit_2_format)
+                slice_bit_2_struct = SliceChunk.slice_bit_2_struct
                 slice["pivot"] = {}
                 (
                     slice["pivot"]["x"],
@@ -4,9 +4,10 @@ from struct import Struct
 class Header(object):
     header_format = '<IHHHHHI2x8xB3xHBB92x'
     header_size = 128
+    header_struct = Struct(header_format)
 
     def __init__(self, data, data_offset = 0):
-        header_struct = Struct(Header.header_format)
+        header_struct = Header.header_struct
 
         (
             self.filesize,
@@ -28,9 +29,10 @@ class Header(object):
 class Frame(object):
     frame_format = '<IHHH6x'
     frame_size = 16
+    frame_struct = Struct(frame_format)
 
     def __init__(self, data, data_offset = 0):
-        frame_struct = Struct(Frame.frame_format)
+        frame_struct = Frame.frame_struct
         (
             self.size,
             self.magic_number,
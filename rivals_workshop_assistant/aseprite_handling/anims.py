@@ -1,11 +1,12 @@
 import asyncio
+import contextlib
 import hashlib
 import itertools
 import os
-import pickle
+from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, TYPE_CHECKING, Dict
+from typing import List, TYPE_CHECKING, Dict, Awaitable, AbstractSet
 
 from loguru import logger
 
@@ -96,10 +97,20 @@ class Anim(TagObject):
         path_params: "AsepritePathParams",
         config_params: "AsepriteConfigParams",
         aseprite_file_path: Path,
+        semaphore: asyncio.Semaphore = None,
+        subfolder_names: List[str] = None,
+        sprites_index: "SpritesFolderIndex" = None,
     ):
-        root_name = get_anim_file_name_root(
-            path_params.root_dir, aseprite_file_path, self.save_name.lower()
-        )
+        if semaphore is None:
+            semaphore = make_export_semaphore()
+        if sprites_index is None:
+            sprites_index = SpritesFolderIndex(path_params.root_dir)
+        if subfolder_names is None:
+            subfolder_names = get_anim_subfolder_names(
+                path_params.root_dir, aseprite_file_path
+            )
+        # anims/vfx/hitfx/star.aseprite -> 'vfx_hitfx_star'
+        root_name = "_".join(subfolder_names + [self.save_name.lower()])
         if config_params.has_small_sprites and self._cares_about_small_sprites():
             scale_param = 1
         else:
@@ -127,6 +138,24 @@ class Anim(TagObject):
         ]
         all_run_params = normal_run_params + splits_run_params + opts_run_params
 
+        # These are shared by every export of this anim, so build them once.
+        export_script_path = _supply_lua_script(path_params, EXPORT_ASEPRITE_LUA_PATH)
+        gets_a_hurtbox = config_params.hurtboxes_enabled and self.gets_a_hurtbox()
+        if gets_a_hurtbox:
+            hurtbox_script_path = _supply_lua_script(
+                path_params, CREATE_HURTBOX_LUA_PATH
+            )
+        common_args = [
+            str(path_params.aseprite_program_path),
+            "-b",
+            *_format_param("filename", aseprite_file_path),
+            *_format_param("startFrame", self.start + 1),
+            *_format_param("endFrame", self.end + 1),
+        ]
+        (path_params.root_dir / paths.SPRITES_FOLDER).mkdir(
+            parents=True, exist_ok=True
+        )
+
         coroutines = []
 
         for run_params in all_run_params:
@@ -136,7 +165,10 @@ class Anim(TagObject):
                     path_params=path_params,
                     aseprite_file_path=aseprite_file_path,
                     base_name=run_params.name,
-                    script_name=EXPORT_ASEPRITE_LUA_PATH,
+                    script_path=export_script_path,
+                    common_args=common_args,
+                    semaphore=semaphore,
+                    sprites_index=sprites_index,
                     lua_params={
                         "scale": scale_param,
                         "targetLayers": target_layers,
@@ -144,13 +176,16 @@ class Anim(TagObject):
                 )
             )
 
-            if config_params.hurtboxes_enabled and self.gets_a_hurtbox():
+            if gets_a_hurtbox:
                 coroutines.append(
                     self._run_lua_export(
                         path_params=path_params,
                         aseprite_file_path=aseprite_file_path,
                         base_name=f"{run_params.name}_hurt",
-                        script_name=CREATE_HURTBOX_LUA_PATH,
+                        script_path=hurtbox_script_path,
+                        common_args=common_args,
+                        semaphore=semaphore,
+                        sprites_index=sprites_index,
                         lua_params={
                             "scale": hurtbox_scale_param,
                             "targetLayers": target_layers,
@@ -159,57 +194,57 @@ class Anim(TagObject):
                         },
                     )
                 )
-        await asyncio.gather(*coroutines)
+        await gather_exports(coroutines)
 
     async def _run_lua_export(
         self,
         path_params: "AsepritePathParams",
         aseprite_file_path: Path,
         base_name: str,
-        script_name: str,
+        script_path: Path,
+        common_args: List[str],
+        semaphore: asyncio.Semaphore,
+        sprites_index: "SpritesFolderIndex",
         lua_params: dict = None,
     ):
-        full_script_path = (
-            path_params.exe_dir / ASEPRITE_LUA_SCRIPTS_FOLDER / script_name
-        ).absolute()
-        supply_lua_script(
-            path=full_script_path,
-        )
-
+        """common_args are the program, batch flag, and script params shared by all
+        of the anim's exports."""
         if lua_params is None:
             lua_params = {}
 
-        _delete_paths_from_glob(
-            path_params.root_dir,
-            f"{base_name}_strip*.png",
-        )
+        for old_path in sprites_index.pop_strips(base_name):
+            os.remove(old_path)
 
         dest_name = f"{base_name}_strip{self.num_frames}.png"
         dest = path_params.root_dir / paths.SPRITES_FOLDER / dest_name
-        dest.parent.mkdir(parents=True, exist_ok=True)
-
-        command_parts = (
-            [
-                f'"{path_params.aseprite_program_path}"',
-                "-b",
-                _format_param("filename", aseprite_file_path),
-                _format_param("dest", dest),
-                _format_param("startFrame", self.start + 1),
-                _format_param("endFrame", self.end + 1),
-            ]
-            + [_format_param(key, value) for key, value in lua_params.items()]
+
+        export_args = (
+            common_args
+            + _format_param("dest", dest)
             + [
-                f'-script "{full_script_path}"',
+                arg
+                for key, value in lua_params.items()
+                for arg in _format_param(key, value)
             ]
+            + ["-script", str(script_path)]
         )
-        export_command = " ".join(command_parts)
+        export_command = " ".join(export_args)
         try:
-            proc = await asyncio.create_subprocess_shell(
-                export_command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await proc.communicate()
+            async with semaphore:
+                proc = await asyncio.create_subprocess_exec(
+                    *export_args,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                try:
+                    stdout, stderr = await proc.communicate()
+                except asyncio.CancelledError:
+                    # Don't leave aseprite running when a sibling export fails.
+                    if proc.returncode is None:
+                        with contextlib.suppress(ProcessLookupError):
+                            proc.kill()
+                    await proc.wait()
+                    raise
             logger.debug(f"Ran lua script: {export_command}")
             if stdout:
                 logger.debug(f"[stdout] {stdout}")
@@ -242,9 +277,8 @@ class Anim(TagObject):
 
     def _get_frame_hash(self):
         try:
-            return hashlib.md5(
-                pickle.dumps(self.content.file_data.frames[self.start : self.end + 1])
-            ).hexdigest()
+            frame_hashes = self.content.frame_hashes[self.start : self.end + 1]
+            return hashlib.md5("".join(frame_hashes).encode()).hexdigest()
         except AttributeError:
             logger.error(
                 f"Could not make checksum for "
@@ -259,28 +293,77 @@ class Anim(TagObject):
         return self.name
 
 
+def _supply_lua_script(path_params: "AsepritePathParams", script_name: str) -> Path:
+    """Make sure the lua script exists in the exe dir, and return its path."""
+    script_path = (
+        path_params.exe_dir / ASEPRITE_LUA_SCRIPTS_FOLDER / script_name
+    ).absolute()
+    supply_lua_script(path=script_path)
+    return script_path
+
+
 def _get_layer_indices(layers: List[LayerChunk]) -> List[int]:
     # change to 1-indexing
     return [layer.layer_index + 1 for layer in layers]
 
 
-def _format_param(param_name, value):
+def _format_param(param_name, value) -> List[str]:
     if isinstance(value, list):
         # Format list as `a,b,c` instead of `[a, b, c]` for easier parsing.
         value = ",".join(str(item) for item in value)
-    return f'-script-param {param_name}="{value}"'
+    return ["-script-param", f"{param_name}={value}"]
+
 
+def make_export_semaphore() -> asyncio.Semaphore:
+    """Limit how many aseprite processes may run at once."""
+    return asyncio.Semaphore(min(32, (os.cpu_count() or 1) * 2))
 
-def _delete_paths_from_glob(root_dir: Path, paths_glob: str):
-    """Delete paths matching the glob"""
-    old_paths = (root_dir / paths.SPRITES_FOLDER).glob(paths_glob)
-    for old_path in old_paths:
-        os.remove(old_path)
+
+async def gather_exports(coroutines: List[Awaitable]) -> list:
+    """Like asyncio.gather, but if any export fails the rest are cancelled
+    before the error is raised, rather than being left running."""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class SpritesFolderIndex:
+    """The strips in the sprites folder, grouped by the name before `_strip`.
+    The folder is listed once, on first use, instead of being globbed for every
+    export."""
+
+    def __init__(self, root_dir: Path):
+        self.folder = root_dir / paths.SPRITES_FOLDER
+        self._strip_names = None
+
+    def pop_strips(self, base_name: str) -> List[Path]:
+        """Return the paths of `{base_name}_strip*.png` files, and forget them."""
+        if self._strip_names is None:
+            self._strip_names = self._read_strip_names()
+        return [self.folder / name for name in self._strip_names.pop(base_name, [])]
+
+    def _read_strip_names(self) -> Dict[str, List[str]]:
+        strip_names = defaultdict(list)
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    base_name, strip, _ = entry.name.rpartition("_strip")
+                    if strip and entry.name.endswith(".png"):
+                        strip_names[base_name].append(entry.name)
+        except FileNotFoundError:
+            pass
+        return strip_names
 
 
-def get_anim_file_name_root(root_dir: Path, aseprite_file_path: Path, name: str) -> str:
-    """Return the anim's name, prefixed with any subfolders the anim is in.
-    anims/vfx/hitfx/star.aseprite -> 'vfx_hitfx_star'"""
+def get_anim_subfolder_names(root_dir: Path, aseprite_file_path: Path) -> List[str]:
+    """Return the names of the subfolders the aseprite file is in, which prefix the
+    names of its anims.
+    anims/vfx/hitfx/star.aseprite -> ['vfx', 'hitfx']"""
     try:
         relative_path = aseprite_file_path.relative_to(root_dir / paths.ANIMS_FOLDER)
     except ValueError:
@@ -289,24 +372,35 @@ def get_anim_file_name_root(root_dir: Path, aseprite_file_path: Path, name: str)
             f"Aseprite file path, isn't in the root dir. This is okay when testing, not in production. "
             f"{dict({'root_dir':root_dir, 'aseprite_file_path': aseprite_file_path})}"
         )
-        return name
+        return []
     subfolders = list(relative_path.parents)[:-1]
-    path_parts = [path.name for path in reversed(subfolders)] + [name]
-    base_name = "_".join(path_parts)
-    return base_name
+    return [path.name for path in reversed(subfolders)]
+
+
+def get_anim_script_name(anim_name: str) -> str:
+    """The name of the attack script that the anim's data is injected into."""
+    return anim_name.replace("HURTBOX", "").strip()
 
 
-def get_anims(aseprites: List["Aseprite"]) -> List["Anim"]:
+def get_anims(
+    aseprites: List["Aseprite"], script_names: AbstractSet[str] = None
+) -> List["Anim"]:
+    """If script_names is given, stale aseprites are skipped unless they may hold
+    an anim for one of those scripts, so unchanged files don't need to be read."""
+    if script_names is not None:
+        aseprites = [
+            aseprite
+            for aseprite in aseprites
+            if aseprite.may_have_anim_for_scripts(script_names)
+        ]
     return list(itertools.chain(*[aseprite.anims for aseprite in aseprites]))
-    # Unfortunately this involves reading every aseprite file...
-    # If we demand that multi-anim files have a name prefix,
-    # we could get away with reading fewer files.
 
 
 async def save_anims(
     path_params: "AsepritePathParams",
     config_params: "AsepriteConfigParams",
     aseprites: List["Aseprite"],
+    semaphore: asyncio.Semaphore = None,
 ):
     if not path_params.aseprite_program_path:
         logger.warning(
@@ -315,10 +409,18 @@ async def save_anims(
             "process aseprite files."
         )
         return
+    if semaphore is None:
+        semaphore = make_export_semaphore()
+    sprites_index = SpritesFolderIndex(path_params.root_dir)
     coroutines = []
     for aseprite in aseprites:
         if aseprite.is_fresh:
             coroutines.append(
-                aseprite.save(path_params=path_params, config_params=config_params)
+                aseprite.save(
+                    path_params=path_params,
+                    config_params=config_params,
+                    semaphore=semaphore,
+                    sprites_index=sprites_index,
+                )
             )
-    await asyncio.gather(*coroutines)
+    await gather_exports(coroutines)
@@ -46,4 +46,5 @@ async def update_anims(
                 is_ssl=get_is_ssl(assistant_config=run_context.assistant_config),
             ),
             aseprites=aseprites,
+            semaphore=run_context.aseprite_semaphore,
         )
@@ -1,14 +1,37 @@
 import asyncio
-import itertools
-from datetime import datetime
+import hashlib
+import mmap
+import os
+import pickle
+from bisect import bisect_left, bisect_right
+from collections import deque
 from pathlib import Path
-from typing import List, TYPE_CHECKING, Iterable, Dict
+from typing import (
+    List,
+    TYPE_CHECKING,
+    Dict,
+    Tuple,
+    AbstractSet,
+    FrozenSet,
+    Iterator,
+)
 
 from rivals_workshop_assistant import assistant_config_mod
-from rivals_workshop_assistant.aseprite_handling.anims import Anim
+from rivals_workshop_assistant.aseprite_handling.anims import (
+    Anim,
+    make_export_semaphore,
+    gather_exports,
+    SpritesFolderIndex,
+    get_anim_subfolder_names,
+    get_anim_script_name,
+)
 from rivals_workshop_assistant.aseprite_handling.windows import Window
 from rivals_workshop_assistant.dotfile_mod import get_script_processed_time
-from rivals_workshop_assistant.file_handling import File, _get_modified_time
+from rivals_workshop_assistant.file_handling import (
+    File,
+    _get_modified_time,
+    _get_modified_time_from_stat,
+)
 from rivals_workshop_assistant.aseprite_handling._aseprite_loading import (
     RawAsepriteFile,
 )
@@ -23,48 +46,76 @@ if TYPE_CHECKING:
     )
 
 
+def _read_raw_aseprite_file(path: Path) -> RawAsepriteFile:
+    # Parse straight from a memory map rather than copying the file into bytes.
+    # RawAsepriteFile copies out what it keeps, so the map can close after.
+    with open(path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped_file, memoryview(mapped_file) as contents:
+        return RawAsepriteFile(contents)
+
+
+def _get_frame_hashes(file_data: RawAsepriteFile) -> List[str]:
+    return [
+        hashlib.md5(pickle.dumps(frame)).hexdigest() for frame in file_data.frames
+    ]
+
+
 class AsepriteFileContent:
     """Data class for the contents of an aseprite file."""
 
     def __init__(
         self,
-        anim_tag_colors: List["TagColor"],
-        window_tag_colors: List["TagColor"],
-        layer_tag_colors: List["TagColor"],
+        anim_tag_colors: AbstractSet["TagColor"],
+        window_tag_colors: AbstractSet["TagColor"],
         file_data: "RawAsepriteFile",
+        layer_tag_colors: List["TagColor"] = None,
         is_fresh: bool = False,
         layers: "AsepriteLayers" = None,  # just so it can be mocked
     ):
-        self.file_data = file_data
         self.anim_tag_colors = anim_tag_colors
         self.window_tag_colors = window_tag_colors
         self.layer_tag_colors = layer_tag_colors
         self.is_fresh = is_fresh
+        self._window_tags = None
 
-        if layers is None and file_data is not None:
-            self.layers = AsepriteLayers.from_file(self.file_data)
-
-    @property
-    def num_frames(self):
-        return self.file_data.get_num_frames()
+        # Keep only what's needed from the parsed file, so it can be freed.
+        if file_data is not None:
+            self.num_frames = file_data.get_num_frames()
+            self.tags = file_data.get_tags()
+            self.frame_hashes = _get_frame_hashes(file_data)
+            if layers is None:
+                layers = AsepriteLayers.from_file(file_data)
+        self.layers = layers
 
     @property
-    def tags(self):
-        return self.file_data.get_tags()
+    def window_tags(self) -> Tuple[List[int], List[int], List[str], List[int]]:
+        """The window tags as parallel lists of starts, ends, names, and each tag's
+        position in the file, sorted by start frame."""
+        if self._window_tags is None:
+            window_tags = sorted(
+                (
+                    (tag.start, tag.end, tag.name, position)
+                    for position, tag in enumerate(self.tags)
+                    if tag.color in self.window_tag_colors
+                ),
+                key=lambda window_tag: window_tag[0],
+            )
+            self._window_tags = tuple(
+                list(column) for column in zip(*window_tags)
+            ) or ([], [], [], [])
+        return self._window_tags
 
     @classmethod
     def from_path(
         cls,
         path: Path,
-        anim_tag_colors: List["TagColor"],
-        window_tag_colors: List["TagColor"],
+        anim_tag_colors: AbstractSet["TagColor"],
+        window_tag_colors: AbstractSet["TagColor"],
         is_fresh: bool,
     ):
-        with open(path, "rb") as f:
-            contents = f.read()
-            raw_aseprite_file = RawAsepriteFile(contents)
         return cls(
-            file_data=raw_aseprite_file,
+            file_data=_read_raw_aseprite_file(path),
             anim_tag_colors=anim_tag_colors,
             window_tag_colors=window_tag_colors,
             is_fresh=is_fresh,
@@ -75,20 +126,27 @@ class Aseprite(File):
     def __init__(
         self,
         path: Path,
-        anim_tag_colors: List["TagColor"],
-        window_tag_colors: List["TagColor"],
-        modified_time: datetime = None,
-        processed_time: datetime = None,
+        anim_tag_colors: AbstractSet["TagColor"],
+        window_tag_colors: AbstractSet["TagColor"],
+        modified_time: int = None,
+        processed_time: int = None,
         content=None,
         anims: Anim = None,
         anim_hashes: Dict[str, str] = None,  # None for testing only
+        anim_hashes_tag_colors: dict = None,
     ):
+        """anim_hashes_tag_colors records the tag colors that the anim_hashes names
+        were made with. Like anim_hashes, it's the dict stored in the dotfile."""
         super().__init__(path, modified_time, processed_time)
         self.anim_tag_colors = anim_tag_colors
         self.window_tag_colors = window_tag_colors
         self.anim_hashes = anim_hashes
+        if anim_hashes_tag_colors is None:
+            anim_hashes_tag_colors = {}
+        self.anim_hashes_tag_colors = anim_hashes_tag_colors
         self._content = content
         self._anims = anims
+        self._subfolder_names = None
 
     @property
     def content(self) -> AsepriteFileContent:
@@ -111,76 +169,98 @@ class Aseprite(File):
             self._anims = self.get_anims()
         return self._anims
 
+    def may_have_anim_for_scripts(self, script_names: AbstractSet[str]) -> bool:
+        """Whether the file needs to be read to find anims for the given scripts.
+        A stale file's anims were all recorded in the anim hashes when it was last
+        processed, so only those names need checking, unless the tag colors have
+        changed since."""
+        if self.is_fresh or not self.anim_hashes:
+            return True
+        if self.anim_hashes_tag_colors != self._get_tag_colors_record():
+            return True
+        return any(
+            get_anim_script_name(anim_name) in script_names
+            for anim_name in self.anim_hashes
+        )
+
+    def get_subfolder_names(self, root_dir: Path) -> List[str]:
+        if self._subfolder_names is None:
+            self._subfolder_names = get_anim_subfolder_names(root_dir, self.path)
+        return self._subfolder_names
+
     async def save(
         self,
         path_params: "AsepritePathParams",
         config_params: "AsepriteConfigParams",
+        semaphore: asyncio.Semaphore = None,
+        sprites_index: SpritesFolderIndex = None,
     ):
+        if semaphore is None:
+            semaphore = make_export_semaphore()
+        if sprites_index is None:
+            sprites_index = SpritesFolderIndex(path_params.root_dir)
+        subfolder_names = self.get_subfolder_names(path_params.root_dir)
         coroutines = []
         for anim in self.anims:
             if anim.is_fresh:
                 coroutines.append(
-                    anim.save(path_params, config_params, aseprite_file_path=self.path)
+                    anim.save(
+                        path_params,
+                        config_params,
+                        aseprite_file_path=self.path,
+                        semaphore=semaphore,
+                        subfolder_names=subfolder_names,
+                        sprites_index=sprites_index,
+                    )
                 )
-        await asyncio.gather(*coroutines)
+        await gather_exports(coroutines)
+
+    def _get_tag_colors_record(self) -> dict:
+        return {
+            "anim": _make_tag_color_record(self.anim_tag_colors),
+            "window": _make_tag_color_record(self.window_tag_colors),
+        }
 
     def get_anims(self):
+        content = self.content
+        anim_tag_colors = self.anim_tag_colors
+        # Making the anims records their names in anim_hashes.
+        self.anim_hashes_tag_colors.update(self._get_tag_colors_record())
         tag_anims = [
-            self.make_anim_with_windows_in_range(
-                name=tag.name,
-                start=tag.start,
-                end=tag.end,
-                file_is_fresh=self.is_fresh,
-                content=self.content,
-                anim_hashes=self.anim_hashes,
-            )
-            for tag in self.content.tags
-            if tag.color in self.anim_tag_colors
+            self._make_anim(tag.name, tag.start, tag.end, content)
+            for tag in content.tags
+            if tag.color in anim_tag_colors
         ]
         if tag_anims:
             return tag_anims
         else:
-            return [
-                self.make_anim_with_windows_in_range(
-                    name=self.name,
-                    start=0,
-                    end=self.content.num_frames - 1,
-                    file_is_fresh=self.is_fresh,
-                    content=self.content,
-                    anim_hashes=self.anim_hashes,
-                )
-            ]
+            return [self._make_anim(self.name, 0, content.num_frames - 1, content)]
 
-    def make_anim_with_windows_in_range(
-        self,
-        name: str,
-        start: int,
-        end: int,
-        file_is_fresh: bool,
-        content: "AsepriteFileContent",
-        anim_hashes: Dict[str, str],
-    ):
+    def _make_anim(
+        self, name: str, start: int, end: int, content: "AsepriteFileContent"
+    ) -> Anim:
         return Anim(
             name=name,
             start=start,
             end=end,
             windows=self.get_windows_in_frame_range(start=start, end=end),
-            file_is_fresh=file_is_fresh,
+            file_is_fresh=self.is_fresh,
             content=content,
-            anim_hashes=anim_hashes,
+            anim_hashes=self.anim_hashes,
         )
 
     def get_windows_in_frame_range(self, start: int, end: int):
-        tags_in_frame_range = [
-            window
-            for window in self.content.tags
-            if window.color in self.window_tag_colors
-            and start <= window.start <= end
-            and start <= window.end <= end
-        ]
+        starts, ends, names, positions = self.content.window_tags
+        low = bisect_left(starts, start)
+        high = bisect_right(starts, end)
+        tags_in_frame_range = sorted(
+            (positions[i], names[i], starts[i], ends[i])
+            for i in range(low, high)
+            if start <= ends[i] <= end
+        )
         windows = [
-            Window(name=tag.name, start=tag.start - start + 1, end=tag.end - start + 1)
-            for tag in tags_in_frame_range
+            Window(name=name, start=tag_start - start + 1, end=tag_end - start + 1)
+            for _, name, tag_start, tag_end in tags_in_frame_range
         ]
         return windows
 
@@ -188,43 +268,88 @@ class Aseprite(File):
         return self.path.name
 
 
-def read_aseprites(run_context: RunContext) -> List[Aseprite]:
-    ase_paths: Iterable[Path] = itertools.chain(
-        *[
-            list((run_context.root_dir / "anims").rglob(f"*.{filetype}"))
-            for filetype in ("ase", "aseprite")
-        ]
+ASEPRITE_SUFFIXES = (".ase", ".aseprite")
+
+
+async def read_aseprites(run_context: RunContext) -> List[Aseprite]:
+    # The walk does all the disk access, so only it needs to leave the event loop.
+    ase_paths_and_stats = await asyncio.to_thread(
+        list, _walk_aseprite_paths(run_context.root_dir / "anims")
     )
     processed_time = get_script_processed_time(dotfile=run_context.dotfile)
-    aseprites = []
-    for path in ase_paths:
-        aseprite = read_aseprite(
+
+    aseprites = [
+        read_aseprite(
             run_context=run_context,
             path=path,
             processed_time=processed_time,
+            modified_time=_get_modified_time_from_stat(stat),
         )
-        aseprites.append(aseprite)
+        for path, stat in ase_paths_and_stats
+    ]
     return aseprites
 
 
+def _walk_aseprite_paths(root: Path) -> Iterator[Tuple[Path, os.stat_result]]:
+    """Yield the path and stat of each aseprite file under the root.
+    The stat comes from the directory listing, which on Windows saves a syscall.
+    Like rglob, symlinked folders aren't followed and unreadable folders are skipped."""
+    folders = deque([str(root)])
+    while folders:
+        folder = folders.popleft()
+        try:
+            entries = os.scandir(folder)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.path)
+                elif entry.name.lower().endswith(ASEPRITE_SUFFIXES):
+                    yield Path(entry.path), entry.stat()
+
+
 def read_aseprite(
-    run_context: RunContext, path: Path, processed_time: datetime = None
+    run_context: RunContext,
+    path: Path,
+    processed_time: int = None,
+    modified_time: int = None,
 ) -> Aseprite:
     if processed_time is None:
         processed_time = get_script_processed_time(dotfile=run_context.dotfile)
+    if modified_time is None:
+        modified_time = _get_modified_time(path)
 
     aseprite = Aseprite(
         path=path,
-        modified_time=_get_modified_time(path),
+        modified_time=modified_time,
         processed_time=processed_time,
-        anim_tag_colors=assistant_config_mod.get_anim_tag_color(
-            run_context.assistant_config
+        anim_tag_colors=_make_tag_color_set(
+            assistant_config_mod.get_anim_tag_color(run_context.assistant_config)
         ),
-        window_tag_colors=assistant_config_mod.get_window_tag_color(
-            run_context.assistant_config
+        window_tag_colors=_make_tag_color_set(
+            assistant_config_mod.get_window_tag_color(run_context.assistant_config)
         ),
         anim_hashes=run_context.dotfile.setdefault("anim_hashes", {}).setdefault(
             path.stem, {}
         ),
+        anim_hashes_tag_colors=run_context.dotfile.setdefault(
+            "anim_hashes_tag_colors", {}
+        ).setdefault(path.stem, {}),
     )
     return aseprite
+
+
+def _make_tag_color_set(tag_colors: List["TagColor"]) -> FrozenSet["TagColor"]:
+    # RGB colors from the config are lists, so make them hashable like parsed tags.
+    return frozenset(
+        tuple(color) if isinstance(color, list) else color for color in tag_colors
+    )
+
+
+def _make_tag_color_record(tag_colors: AbstractSet["TagColor"]) -> List["TagColor"]:
+    """A form of the tag colors that can be saved in the dotfile and compared."""
+    return sorted(
+        (list(color) if isinstance(color, tuple) else color for color in tag_colors),
+        key=str,
+    )
@@ -1,8 +1,8 @@
 import typing
-from datetime import datetime
 from pathlib import Path
 
 import rivals_workshop_assistant.info_files as info_files
+from rivals_workshop_assistant.file_handling import _to_time_ns
 from rivals_workshop_assistant.modes import Mode
 from rivals_workshop_assistant.paths import ASSISTANT_FOLDER
 from rivals_workshop_assistant.run_context import RunContext
@@ -45,7 +45,8 @@ def save_dotfile(run_context: RunContext):
     info_files.save(path=run_context.root_dir / PATH, content=run_context.dotfile)
 
 
-def update_dotfile_after_saving(dotfile: dict, now: datetime, mode: Mode):
+def update_dotfile_after_saving(dotfile: dict, now: int, mode: Mode):
+    """now is in nanoseconds since the epoch, as from time.time_ns()"""
     if mode in (Mode.ALL, Mode.SCRIPTS):
         dotfile[SCRIPT_PROCESSED_TIME_FIELD] = now
     if mode in (Mode.ALL, Mode.ANIMS):
@@ -58,47 +59,66 @@ def update_all_dotfile_injection_clients(
     script: "Script",
 ):
     if dotfile is not None:
-        inject_scripts = []
-        for injection in needed_injects:
-            if not (injection.filepath is None or injection.filepath in inject_scripts):
-                inject_scripts.append(injection.filepath)
+        # dict keeps the first-seen order while dropping duplicates.
+        inject_scripts = list(
+            dict.fromkeys(
+                injection.filepath
+                for injection in needed_injects
+                if injection.filepath is not None
+            )
+        )
 
         update_dotfile_injection_clients(
-            dotfile=dotfile, client_script=script.path, dependencies=inject_scripts
+            dotfile=dotfile,
+            client_script=script.path,
+            dependencies=inject_scripts,
+            client_key=script.posix_path,
         )
 
 
 def update_dotfile_injection_clients(
-    dotfile: dict, client_script: Path, dependencies: typing.List[Path]
+    dotfile: dict,
+    client_script: Path,
+    dependencies: typing.List[Path],
+    client_key: str = None,
 ):
+    """client_key is client_script.as_posix(), if the caller already has it."""
     if INJECT_CLIENTS_FIELD not in dotfile:
         dotfile[INJECT_CLIENTS_FIELD] = {}
+    if client_key is None:
+        client_key = client_script.as_posix()
 
     if len(dependencies) > 0:
-        dotfile[INJECT_CLIENTS_FIELD][client_script.as_posix()] = [
+        dotfile[INJECT_CLIENTS_FIELD][client_key] = [
             dep.as_posix() for dep in dependencies
         ]
-    elif client_script.as_posix() in dotfile[INJECT_CLIENTS_FIELD]:
-        dotfile[INJECT_CLIENTS_FIELD].pop(client_script.as_posix())
+    elif client_key in dotfile[INJECT_CLIENTS_FIELD]:
+        dotfile[INJECT_CLIENTS_FIELD].pop(client_key)
 
 
 def get_clients_for_injection(
     dotfile: dict, injection_script: Path
 ) -> typing.List[Path]:
-    if INJECT_CLIENTS_FIELD not in dotfile:
-        return []
+    clients = get_clients_by_injection(dotfile).get(injection_script.as_posix(), [])
+    return [Path(client) for client in clients]
+
 
-    path_string = injection_script.as_posix()
-    clients = []
-    for key in dotfile[INJECT_CLIENTS_FIELD].keys():
-        if path_string in dotfile[INJECT_CLIENTS_FIELD][key]:
-            clients.append(Path(key))
-    return clients
+def get_clients_by_injection(dotfile: dict) -> typing.Dict[str, typing.List[str]]:
+    """Invert the dotfile's {client script: [injection scripts]} to
+    {injection script: [client scripts]}, so many injections can be looked up
+    without searching every client each time."""
+    clients_by_injection = {}
+    for client, dependencies in dotfile.get(INJECT_CLIENTS_FIELD, {}).items():
+        for dependency in dependencies:
+            clients = clients_by_injection.setdefault(dependency, [])
+            if client not in clients:
+                clients.append(client)
+    return clients_by_injection
 
 
-def get_script_processed_time(dotfile: dict) -> typing.Optional[datetime]:
-    return dotfile.get(SCRIPT_PROCESSED_TIME_FIELD, None)
+def get_script_processed_time(dotfile: dict) -> typing.Optional[int]:
+    return _to_time_ns(dotfile.get(SCRIPT_PROCESSED_TIME_FIELD, None))
 
 
-def get_anim_processed_time(dotfile: dict) -> typing.Optional[datetime]:
-    return dotfile.get(ANIM_PROCESSED_TIME_FIELD, None)
+def get_anim_processed_time(dotfile: dict) -> typing.Optional[int]:
+    return _to_time_ns(dotfile.get(ANIM_PROCESSED_TIME_FIELD, None))
@@ -1,3 +1,5 @@
+import os
+import typing
 from datetime import datetime
 from pathlib import Path
 
@@ -15,7 +17,7 @@ def create_file(path: Path, content: str, overwrite=False):
         f.write(content)
 
 
-def _get_is_fresh(processed_time: datetime, modified_time: datetime):
+def _get_is_fresh(processed_time: typing.Optional[int], modified_time: int):
     if processed_time is None:
         return True
     return processed_time < modified_time
@@ -25,15 +27,30 @@ class File:
     def __init__(
         self,
         path: Path,
-        modified_time: datetime = None,
-        processed_time: datetime = None,
+        modified_time: int = None,
+        processed_time: int = None,
     ):
+        """Times are integer nanoseconds since the epoch, as in os.stat's st_mtime_ns."""
         if modified_time is None:
             modified_time = _get_modified_time(path)
 
         self.path = path
+        # The key the file is stored under in the dotfile.
+        self.posix_path = path.as_posix()
         self.is_fresh = _get_is_fresh(processed_time, modified_time)
 
 
-def _get_modified_time(path: Path) -> datetime:
-    return datetime.fromtimestamp(path.stat().st_mtime)
+def _get_modified_time(path: Path) -> int:
+    return _get_modified_time_from_stat(path.stat())
+
+
+def _get_modified_time_from_stat(stat: os.stat_result) -> int:
+    return stat.st_mtime_ns
+
+
+def _to_time_ns(time: typing.Union[int, datetime, None]) -> typing.Optional[int]:
+    """Convert a datetime, such as one saved in an older dotfile, to nanoseconds
+    since the epoch. Integers and None are returned as they are."""
+    if isinstance(time, datetime):
+        return int(time.timestamp()) * 1_000_000_000 + time.microsecond * 1000
+    return time
@@ -1,6 +1,7 @@
 import asyncio
-import datetime
+import contextlib
 import sys
+import time
 from pathlib import Path
 
 import notifiers
@@ -42,6 +43,7 @@ from rivals_workshop_assistant.setup import (
 )
 from rivals_workshop_assistant.script_handling.injection import (
     freshen_scripts_that_have_modified_dependencies,
+    read_injection_library,
 )
 
 __version__ = "1.4.0"
@@ -175,25 +177,43 @@ async def update_files(exe_dir: Path, root_dir: Path, mode: Mode.ALL):
 
     await updating.update(run_context)
 
-    scripts = read_scripts(run_context)
+    injection_library_task = None
+    if mode in (mode.ALL, mode.SCRIPTS):
+        # Read the library in the background while the other files are read.
+        injection_library_task = asyncio.create_task(
+            asyncio.to_thread(read_injection_library, run_context.root_dir)
+        )
 
-    user_inject_scripts = read_user_inject(run_context)
-    lib_inject_scripts = read_lib_inject(run_context)
+    try:
+        scripts = read_scripts(run_context)
 
-    freshen_scripts_that_have_modified_dependencies(
-        run_context.dotfile,
-        scripts=scripts,
-        inject_scripts=user_inject_scripts + lib_inject_scripts,
-    )
+        user_inject_scripts = read_user_inject(run_context)
+        lib_inject_scripts = read_lib_inject(run_context)
 
-    aseprites = read_aseprites(run_context)
-    if mode in (mode.ALL, mode.SCRIPTS):
-        update_scripts(
-            run_context=run_context,
+        freshen_scripts_that_have_modified_dependencies(
+            run_context.dotfile,
             scripts=scripts,
-            aseprites=aseprites,
+            inject_scripts=user_inject_scripts + lib_inject_scripts,
         )
 
+        aseprites = await read_aseprites(run_context)
+        if mode in (mode.ALL, mode.SCRIPTS):
+            injection_library = await injection_library_task
+            injection_library_task = None
+            update_scripts(
+                run_context=run_context,
+                scripts=scripts,
+                aseprites=aseprites,
+                injection_library=injection_library,
+            )
+    finally:
+        if injection_library_task is not None:
+            # An earlier step failed, so the library won't be used.
+            # Don't leave the task, or an error from it, unretrieved.
+            injection_library_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await injection_library_task
+
     if mode in (mode.ALL, mode.ANIMS):
         await update_anims(
             run_context=run_context,
@@ -202,7 +222,7 @@ async def update_files(exe_dir: Path, root_dir: Path, mode: Mode.ALL):
         )
 
     update_dotfile_after_saving(
-        now=datetime.datetime.now(), dotfile=run_context.dotfile, mode=mode
+        now=time.time_ns(), dotfile=run_context.dotfile, mode=mode
     )
 
     assets = get_required_assets(scripts)
@@ -1,7 +1,7 @@
 import asyncio
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from loguru import logger
 
@@ -10,6 +10,7 @@ from rivals_workshop_assistant import (
     assistant_config_mod,
     character_config_mod,
 )
+from rivals_workshop_assistant.aseprite_handling.anims import make_export_semaphore
 
 
 @dataclass
@@ -19,6 +20,7 @@ class RunContext:
     dotfile: dict
     assistant_config: dict
     character_config: dict
+    aseprite_semaphore: Optional[asyncio.Semaphore] = None
 
 
 async def make_run_context_from_paths(exe_dir: Path, root_dir: Path) -> RunContext:
@@ -29,6 +31,7 @@ async def make_run_context_from_paths(exe_dir: Path, root_dir: Path) -> RunConte
         dotfile=dotfile,
         assistant_config=assistant_config,
         character_config=character_config,
+        aseprite_semaphore=make_export_semaphore(),
     )
     logger.info(f"Dotfile is {dotfile}")
     logger.info(f"assistant config is {assistant_config}")
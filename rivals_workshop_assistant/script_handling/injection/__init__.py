@@ -2,10 +2,11 @@ import typing
 from typing import List
 
 from .application import apply_injection
+from .dependency_handling import GmlInjection
 from .library import read_injection_library
 
 from rivals_workshop_assistant.aseprite_handling import Anim
-from rivals_workshop_assistant.dotfile_mod import get_clients_for_injection
+from rivals_workshop_assistant.dotfile_mod import get_clients_by_injection
 from rivals_workshop_assistant.run_context import RunContext
 
 if typing.TYPE_CHECKING:
@@ -13,10 +14,15 @@ if typing.TYPE_CHECKING:
 
 
 def handle_injection(
-    run_context: RunContext, scripts: list["Script"], anims: List[Anim]
+    run_context: RunContext,
+    scripts: list["Script"],
+    anims: List[Anim],
+    injection_library: List[GmlInjection] = None,
 ):
-    """Controller"""
-    injection_library = read_injection_library(run_context.root_dir)
+    """Controller
+    injection_library can be passed if it was already read, otherwise it's read here."""
+    if injection_library is None:
+        injection_library = read_injection_library(run_context.root_dir)
     apply_injection(
         scripts=scripts,
         injection_library=injection_library,
@@ -30,12 +36,17 @@ def freshen_scripts_that_have_modified_dependencies(
 ):
     """Sets each script with modified dependencies to be considered freshly changed"""
 
-    for inject_script in inject_scripts:
-        if inject_script.is_fresh:
-            # if an inject file has changed, mark its clients for update
-            clients = get_clients_for_injection(
-                dotfile=dotfile, injection_script=inject_script.path
-            )
-            for script in scripts:
-                if script.path in clients:
-                    script.file_is_fresh = True
+    fresh_inject_scripts = [
+        inject_script for inject_script in inject_scripts if inject_script.is_fresh
+    ]
+    if not fresh_inject_scripts:
+        return
+
+    # if an inject file has changed, mark its clients for update
+    clients_by_injection = get_clients_by_injection(dotfile)
+    clients = set()
+    for inject_script in fresh_inject_scripts:
+        clients.update(clients_by_injection.get(inject_script.posix_path, []))
+    for script in scripts:
+        if script.posix_path in clients:
+            script.file_is_fresh = True
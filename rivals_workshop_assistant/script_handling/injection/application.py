@@ -5,6 +5,7 @@ from typing import List
 from .dependency_handling import GmlInjection
 from rivals_workshop_assistant.dotfile_mod import update_all_dotfile_injection_clients
 from rivals_workshop_assistant.aseprite_handling import Anim
+from rivals_workshop_assistant.aseprite_handling.anims import get_anim_script_name
 
 if typing.TYPE_CHECKING:
     from rivals_workshop_assistant.script_handling.script_mod import Script
@@ -83,15 +84,18 @@ def _get_anim_data_gmls_needed_in_gml(anim: Anim):
 def _get_anim_for_script(script: "Script", anims: List[Anim]) -> typing.Optional[Anim]:
     # TODO If we have access to the dotfile here, we can look up in the anim hashes which aseprite an anim belongs to
     #   and then we can only load that aseprite's anims
-    if script.path.parent.name != "attacks":
+    if not is_attack_script(script):
         return None
     for anim in anims:
-        cleaned_name = anim.name.replace("HURTBOX", "").strip()
-        if cleaned_name == script.path.stem:
+        if get_anim_script_name(anim.name) == script.path.stem:
             return anim
     return None
 
 
+def is_attack_script(script: "Script") -> bool:
+    return script.path.parent.name == "attacks"
+
+
 def _get_injects_needed_in_gml(
     gml: str, injection_library: List[GmlInjection]
 ) -> List[GmlInjection]:
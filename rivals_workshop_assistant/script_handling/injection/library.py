@@ -1,7 +1,8 @@
 import itertools
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Tuple, Iterator
 
 import rivals_workshop_assistant.paths
 from .dependency_handling import (
@@ -12,19 +13,26 @@ from .dependency_handling import (
 )
 
 
+_READ_LIBRARY_MAX_WORKERS = 16
+
+
 def read_injection_library(root_dir: Path) -> List[GmlInjection]:
     """Controller"""
-    inject_gml_paths = list(
-        (root_dir / rivals_workshop_assistant.paths.INJECT_FOLDER).rglob("*.gml")
-    ) + list(
-        (root_dir / rivals_workshop_assistant.paths.USER_INJECT_FOLDER).rglob("*.gml")
+    # The library is many small files, so read them in parallel.
+    # map keeps the results in file order.
+    with ThreadPoolExecutor(max_workers=_READ_LIBRARY_MAX_WORKERS) as executor:
+        file_libs = executor.map(
+            get_injection_library_from_file, _get_injection_gml_paths(root_dir)
+        )
+        return list(itertools.chain.from_iterable(file_libs))
+
+
+def _get_injection_gml_paths(root_dir: Path) -> Iterator[Path]:
+    return itertools.chain(
+        (root_dir / rivals_workshop_assistant.paths.INJECT_FOLDER).rglob("*.gml"),
+        (root_dir / rivals_workshop_assistant.paths.USER_INJECT_FOLDER).rglob("*.gml"),
     )
 
-    full_lib = []
-    for file in inject_gml_paths:
-        full_lib.extend(get_injection_library_from_file(file))
-    return full_lib
-
 
 def grouper(n, iterable, fillvalue=None):
     """grouper(3, 'ABCDEFG', 'x') --> ABC DEF Gxx"""
@@ -1,7 +1,6 @@
 # noinspection PyPackageRequirements
 from backports.cached_property import cached_property
 from pathlib import Path
-from datetime import datetime
 from typing import List
 
 from loguru import logger
@@ -24,10 +23,10 @@ class Script(File):
     def __init__(
         self,
         path: Path,
-        modified_time: datetime,
+        modified_time: int,
         original_content: str = None,
         working_content: str = None,
-        processed_time: datetime = None,
+        processed_time: int = None,
     ):
         super().__init__(path, modified_time, processed_time)
         self._original_content = original_content
@@ -79,7 +78,7 @@ class Script(File):
 
 def read_scripts(run_context: RunContext, folder: str = SCRIPTS_FOLDER) -> List[Script]:
     """Returns all Scripts in a given directory (defaults to the scripts folder)."""
-    gml_paths = list((run_context.root_dir / folder).rglob("*.gml"))
+    gml_paths = (run_context.root_dir / folder).rglob("*.gml")
     processed_time = get_script_processed_time(dotfile=run_context.dotfile)
 
     scripts = []
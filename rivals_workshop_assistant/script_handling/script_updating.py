@@ -6,21 +6,35 @@ from rivals_workshop_assistant.aseprite_handling.aseprites import Aseprite
 from rivals_workshop_assistant.run_context import RunContext
 from rivals_workshop_assistant.script_handling.code_generation import handle_codegen
 from rivals_workshop_assistant.script_handling.injection import handle_injection
+from rivals_workshop_assistant.script_handling.injection.application import (
+    is_attack_script,
+)
+from rivals_workshop_assistant.script_handling.injection.dependency_handling import (
+    GmlInjection,
+)
 from rivals_workshop_assistant.script_handling.script_mod import Script, save_scripts
 from rivals_workshop_assistant.script_handling.warning_handling import handle_warning
 
 
 def update_scripts(
-    run_context: RunContext, scripts: list[Script], aseprites: list[Aseprite]
+    run_context: RunContext,
+    scripts: list[Script],
+    aseprites: list[Aseprite],
+    injection_library: List[GmlInjection] = None,
 ):
-    # I don't like that we need to load all anims to update scripts.
-    # Instead, could save the attack timing info to the dotfile when animations run,
-    # and then propagate to scripts. That would require doing animations first each run.
-    anims = get_anims(aseprites)
+    # Anims from unchanged aseprites are only used by scripts that changed,
+    # so the other unchanged aseprites don't need to be read.
+    fresh_attack_script_names = {
+        script.path.stem
+        for script in scripts
+        if script.is_fresh and is_attack_script(script)
+    }
+    anims = get_anims(aseprites, script_names=fresh_attack_script_names)
     handle_scripts(
         run_context=run_context,
         scripts=scripts,
         anims=anims,
+        injection_library=injection_library,
     )
     save_scripts(run_context.root_dir, scripts)
 
@@ -29,7 +43,13 @@ def handle_scripts(
     run_context: RunContext,
     scripts: List[Script],
     anims: List[Anim],
+    injection_library: List[GmlInjection] = None,
 ):
     handle_warning(assistant_config=run_context.assistant_config, scripts=scripts)
     handle_codegen(scripts)
-    handle_injection(run_context, scripts=scripts, anims=anims)
+    handle_injection(
+        run_context,
+        scripts=scripts,
+        anims=anims,
+        injection_library=injection_library,
+    )
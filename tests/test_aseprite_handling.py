@@ -1,8 +1,11 @@
+import asyncio
+from types import SimpleNamespace
 from typing import List
 from configparser import ConfigParser
 from pathlib import Path
 
 import pytest
+from testfixtures import TempDirectory
 
 import rivals_workshop_assistant.assistant_config_mod
 import rivals_workshop_assistant.character_config_mod
@@ -15,10 +18,25 @@ from rivals_workshop_assistant.aseprite_handling import (
 from rivals_workshop_assistant.aseprite_handling.aseprites import (
     AsepriteFileContent,
     Aseprite,
+    read_aseprite,
 )
+from rivals_workshop_assistant.aseprite_handling.anims import (
+    SpritesFolderIndex,
+    gather_exports,
+    get_anims,
+)
+from rivals_workshop_assistant.aseprite_handling.layers import AsepriteLayers
+from rivals_workshop_assistant.aseprite_handling.params import (
+    AsepritePathParams,
+    AsepriteConfigParams,
+)
+from rivals_workshop_assistant.assistant_config_mod import ANIM_TAG_COLOR_FIELD
+from rivals_workshop_assistant import paths
 from tests.testing_helpers import (
     make_script,
     make_time,
+    make_run_context,
+    TEST_EARLIER_DATETIME_STRING,
 )
 from rivals_workshop_assistant import character_config_mod
 
@@ -243,3 +261,279 @@ def test_anim_with_different_previous_hash_is_fresh():
 def test_anim_with_matching_previous_hash_is_not_fresh():
     anim = make_anim(name="name", anim_hashes={"name": MY_HASH}, frame_hash=MY_HASH)
     assert not anim.is_fresh
+
+
+def test_aseprite_file_content_from_path():
+    result = AsepriteFileContent.from_path(
+        Path("tests/assets/sprites/1frame.aseprite"),
+        anim_tag_colors=["green"],
+        window_tag_colors=["orange"],
+        is_fresh=True,
+    )
+
+    assert result.num_frames == 1
+    assert len(result.frame_hashes) == 1
+
+
+def test_aseprite_windows_in_frame_range_keep_file_order():
+    sut = make_fake_aseprite(
+        tags=[
+            AsepriteTag(name="late", start=5, end=6, color="orange"),
+            AsepriteTag(name="early", start=3, end=4, color="orange"),
+            AsepriteTag(name="not_a_window", start=3, end=3, color="red"),
+            AsepriteTag(name="too_long", start=4, end=9, color="orange"),
+            AsepriteTag(name="too_early", start=1, end=3, color="orange"),
+        ],
+        anim_tag_color=["red"],
+        window_tag_color=["orange"],
+    )
+
+    result = sut.get_windows_in_frame_range(start=3, end=6)
+
+    assert result == [
+        Window(name="late", start=3, end=4),
+        Window(name="early", start=1, end=2),
+    ]
+
+
+def test_read_aseprite_makes_config_tag_colors_hashable():
+    run_context = make_run_context(
+        assistant_config={ANIM_TAG_COLOR_FIELD: ["red", [1, 2, 3]]}
+    )
+
+    result = read_aseprite(
+        run_context=run_context, path=Path("tests/assets/sprites/1frame.aseprite")
+    )
+
+    assert result.anim_tag_colors == frozenset({"red", (1, 2, 3)})
+
+
+RED_ORANGE_TAG_COLORS_RECORD = {"anim": ["red"], "window": ["orange"]}
+
+
+@pytest.mark.parametrize(
+    "is_fresh, anim_hashes, anim_hashes_tag_colors, expected",
+    [
+        pytest.param(
+            True, {"HURTBOX bair": MY_HASH}, RED_ORANGE_TAG_COLORS_RECORD, True
+        ),
+        pytest.param(False, {}, RED_ORANGE_TAG_COLORS_RECORD, True),
+        pytest.param(
+            False, {"HURTBOX bair": MY_HASH}, RED_ORANGE_TAG_COLORS_RECORD, True
+        ),
+        pytest.param(False, {"idle": MY_HASH}, RED_ORANGE_TAG_COLORS_RECORD, False),
+        pytest.param(False, {"idle": MY_HASH}, {}, True),
+        pytest.param(
+            False, {"idle": MY_HASH}, {"anim": ["blue"], "window": ["orange"]}, True
+        ),
+    ],
+)
+def test_aseprite_may_have_anim_for_scripts(
+    is_fresh, anim_hashes, anim_hashes_tag_colors, expected
+):
+    sut = Aseprite(
+        path=Path("a"),
+        modified_time=make_time(),
+        anim_tag_colors={"red"},
+        window_tag_colors={"orange"},
+        anim_hashes=anim_hashes,
+        anim_hashes_tag_colors=anim_hashes_tag_colors,
+    )
+    sut.is_fresh = is_fresh
+
+    assert sut.may_have_anim_for_scripts({"bair"}) == expected
+
+
+def test_get_anims_does_not_read_unneeded_stale_aseprites():
+    class UnreadableAseprite(Aseprite):
+        @property
+        def content(self):
+            raise AssertionError("Stale aseprite should not be read")
+
+    stale = UnreadableAseprite(
+        path=Path("idle"),
+        modified_time=make_time(),
+        processed_time=make_time(),
+        anim_tag_colors={"red"},
+        window_tag_colors={"orange"},
+        anim_hashes={"idle": MY_HASH},
+        anim_hashes_tag_colors=RED_ORANGE_TAG_COLORS_RECORD,
+    )
+
+    assert get_anims([stale], script_names={"bair"}) == []
+
+
+def test_get_anims_reads_stale_aseprite_after_tag_color_change():
+    path = Path("tests/assets/sprites/1frame_2frame_red_tag.aseprite")
+    dotfile = {}
+    first_run = read_aseprite(
+        run_context=make_run_context(dotfile=dotfile), path=path
+    )
+    assert [anim.name for anim in first_run.anims] == [path.stem]
+
+    stale = read_aseprite(
+        run_context=make_run_context(
+            dotfile=dotfile,
+            assistant_config={ANIM_TAG_COLOR_FIELD: ["red"]},
+        ),
+        path=path,
+        processed_time=make_time(),
+        modified_time=make_time(TEST_EARLIER_DATETIME_STRING),
+    )
+
+    result = get_anims([stale], script_names={"2frame"})
+
+    assert [anim.name for anim in result] == ["1frame", "2frame"]
+
+
+def test_sprites_folder_index_pops_strips_for_base_name():
+    with TempDirectory() as tmp:
+        for name in [
+            "bair_strip3.png",
+            "bair_hurt_strip3.png",
+            "bair_strip4.png",
+            "bair_notes.txt",
+        ]:
+            tmp.write((paths.SPRITES_FOLDER / name).as_posix(), b"")
+        sprites_folder = Path(tmp.path) / paths.SPRITES_FOLDER
+        sut = SpritesFolderIndex(Path(tmp.path))
+
+        assert sorted(sut.pop_strips("bair")) == [
+            sprites_folder / "bair_strip3.png",
+            sprites_folder / "bair_strip4.png",
+        ]
+        assert sut.pop_strips("bair") == []
+        assert sut.pop_strips("bair_hurt") == [sprites_folder / "bair_hurt_strip3.png"]
+
+
+@pytest.mark.asyncio
+async def test_gather_exports_cancels_the_rest_on_error():
+    slow_export_finished = False
+
+    async def slow_export():
+        nonlocal slow_export_finished
+        await asyncio.sleep(10)
+        slow_export_finished = True
+
+    async def failing_export():
+        raise ValueError
+
+    slow_task = asyncio.ensure_future(slow_export())
+    with pytest.raises(ValueError):
+        await gather_exports([slow_task, failing_export()])
+
+    assert slow_task.cancelled()
+    assert not slow_export_finished
+
+
+@pytest.mark.asyncio
+async def test_anim_save_passes_export_args_without_shell_quoting(monkeypatch):
+    exported_args = []
+
+    async def fake_create_subprocess_exec(*args, **kwargs):
+        exported_args.append(list(args))
+
+        async def communicate():
+            return b"", b""
+
+        return SimpleNamespace(returncode=0, communicate=communicate)
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_create_subprocess_exec)
+
+    with TempDirectory() as tmp:
+        exe_dir = Path(tmp.path) / "my exe"
+        (exe_dir / paths.ASEPRITE_LUA_SCRIPTS_FOLDER).mkdir(parents=True)
+        root_dir = Path(tmp.path) / "my character"
+        aseprite_file_path = root_dir / paths.ANIMS_FOLDER / "my bair.aseprite"
+        program_path = Path(tmp.path) / "Program Files" / "Aseprite" / "aseprite.exe"
+        layers = AsepriteLayers(
+            normals=[SimpleNamespace(layer_index=0), SimpleNamespace(layer_index=2)],
+            splits={},
+            opts={},
+        )
+        sut = Anim(
+            name="bair",
+            start=1,
+            end=2,
+            content=SimpleNamespace(layers=layers),
+            frame_hash=MY_HASH,
+        )
+
+        await sut.save(
+            path_params=AsepritePathParams(
+                exe_dir=exe_dir, root_dir=root_dir, aseprite_program_path=program_path
+            ),
+            config_params=AsepriteConfigParams(),
+            aseprite_file_path=aseprite_file_path,
+            subfolder_names=[],
+        )
+
+        assert exported_args == [
+            [
+                str(program_path),
+                "-b",
+                "-script-param",
+                f"filename={aseprite_file_path}",
+                "-script-param",
+                "startFrame=2",
+                "-script-param",
+                "endFrame=3",
+                "-script-param",
+                f"dest={root_dir / paths.SPRITES_FOLDER / 'bair_strip2.png'}",
+                "-script-param",
+                "scale=1",
+                "-script-param",
+                "targetLayers=1,3",
+                "-script",
+                str(
+                    (
+                        exe_dir / paths.ASEPRITE_LUA_SCRIPTS_FOLDER / "export_aseprite.lua"
+                    ).absolute()
+                ),
+            ]
+        ]
+
+
+@pytest.mark.asyncio
+async def test_anim_export_cancel_survives_already_exited_process(monkeypatch):
+    waited = False
+
+    async def fake_create_subprocess_exec(*args, **kwargs):
+        async def communicate():
+            await asyncio.sleep(10)
+
+        def kill():
+            raise ProcessLookupError
+
+        async def wait():
+            nonlocal waited
+            waited = True
+
+        return SimpleNamespace(
+            returncode=None, communicate=communicate, kill=kill, wait=wait
+        )
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_create_subprocess_exec)
+
+    with TempDirectory() as tmp:
+        root_dir = Path(tmp.path)
+        sut = make_anim(frame_hash=MY_HASH)
+        export = asyncio.ensure_future(
+            sut._run_lua_export(
+                path_params=AsepritePathParams(
+                    exe_dir=root_dir, root_dir=root_dir, aseprite_program_path="ase"
+                ),
+                aseprite_file_path=root_dir / "a.aseprite",
+                base_name="name",
+                script_path=root_dir / "script.lua",
+                common_args=[],
+                semaphore=asyncio.Semaphore(1),
+                sprites_index=SpritesFolderIndex(root_dir),
+            )
+        )
+        await asyncio.sleep(0)
+        export.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await export
+        assert waited
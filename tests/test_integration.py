@@ -267,11 +267,12 @@ def test__make_basic_folder_structure__overwrites_config():
             assert actual == expected
 
 
-def test__read_aseprites():
+@pytest.mark.asyncio
+async def test__read_aseprites():
     with TempDirectoryWithSpace() as tmp:
         supply_aseprites(tmp, TEST_ANIM_NAME)
 
-        result = rivals_workshop_assistant.aseprite_handling.aseprites.read_aseprites(
+        result = await rivals_workshop_assistant.aseprite_handling.aseprites.read_aseprites(
             make_run_context(root_dir=Path(tmp.path))
         )
         assert len(result) == 1
@@ -279,6 +280,43 @@ def test__read_aseprites():
         assert result[0].is_fresh
 
 
+@pytest.mark.asyncio
+async def test__read_aseprites__in_subfolders():
+    with TempDirectoryWithSpace() as tmp:
+        supply_aseprites(tmp, TEST_ANIM_NAME, relative_dest=Path("anims/vfx/hitfx"))
+        supply_aseprites(tmp, Path("1frame.png"), relative_dest=Path("anims"))
+
+        result = await rivals_workshop_assistant.aseprite_handling.aseprites.read_aseprites(
+            make_run_context(root_dir=Path(tmp.path))
+        )
+        assert [aseprite.path for aseprite in result] == [
+            Path(tmp.path) / paths.ANIMS_FOLDER / "vfx" / "hitfx" / TEST_ANIM_NAME
+        ]
+
+
+@pytest.mark.asyncio
+async def test__read_aseprites__does_not_follow_symlinked_folders():
+    with TempDirectoryWithSpace() as tmp:
+        supply_aseprites(tmp, TEST_ANIM_NAME, relative_dest=Path("anims/sub"))
+        anims_dir = Path(tmp.path) / paths.ANIMS_FOLDER
+        loop = anims_dir / "sub" / "loop"
+        try:
+            loop.symlink_to(anims_dir, target_is_directory=True)
+        except OSError:
+            pytest.skip("Symlinks not supported")
+
+        try:
+            result = await rivals_workshop_assistant.aseprite_handling.aseprites.read_aseprites(
+                make_run_context(root_dir=Path(tmp.path))
+            )
+        finally:
+            # The temp directory cleanup would follow the loop.
+            loop.unlink()
+        assert [aseprite.path for aseprite in result] == [
+            anims_dir / "sub" / TEST_ANIM_NAME
+        ]
+
+
 def assert_anim_matches_test_anim(
     root_dir,
     filename=f"{TEST_ANIM_NAME.stem}_strip3.png",
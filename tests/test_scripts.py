@@ -1,3 +1,6 @@
+import datetime
+from pathlib import Path
+
 from rivals_workshop_assistant import dotfile_mod
 from rivals_workshop_assistant.file_handling import File
 from rivals_workshop_assistant.modes import Mode
@@ -5,6 +8,7 @@ from tests.testing_helpers import (
     make_time,
     TEST_LATER_DATETIME_STRING,
     TEST_EARLIER_DATETIME_STRING,
+    TEST_DATETIME_STRING,
     PATH_A,
 )
 
@@ -32,6 +36,20 @@ def test_get_processed_time():
     assert anim_result == make_time()
 
 
+def test_get_processed_time__old_dotfile_datetime__converted_to_ns():
+    old_time = datetime.datetime.fromisoformat(TEST_DATETIME_STRING)
+    dotfile = {
+        dotfile_mod.SCRIPT_PROCESSED_TIME_FIELD: old_time,
+        dotfile_mod.ANIM_PROCESSED_TIME_FIELD: old_time,
+    }
+
+    script_result = dotfile_mod.get_script_processed_time(dotfile=dotfile)
+    anim_result = dotfile_mod.get_anim_processed_time(dotfile=dotfile)
+
+    assert script_result == make_time()
+    assert anim_result == make_time()
+
+
 def test_dotfile_after_saving():
     dotfile = {
         dotfile_mod.SCRIPT_PROCESSED_TIME_FIELD: make_time(TEST_LATER_DATETIME_STRING),
@@ -66,3 +84,36 @@ def file_modified_since_last_run_is_fresh():
     )
 
     assert file.is_fresh
+
+
+def test_get_clients_for_injection_follows_updates():
+    dotfile = {
+        dotfile_mod.INJECT_CLIENTS_FIELD: {
+            "scripts/a.gml": ["inject/x.gml", "inject/y.gml"],
+            "scripts/b.gml": ["inject/x.gml"],
+        }
+    }
+    assert dotfile_mod.get_clients_for_injection(
+        dotfile=dotfile, injection_script=Path("inject/x.gml")
+    ) == [Path("scripts/a.gml"), Path("scripts/b.gml")]
+
+    dotfile_mod.update_dotfile_injection_clients(
+        dotfile=dotfile,
+        client_script=Path("scripts/a.gml"),
+        dependencies=[Path("inject/y.gml")],
+    )
+    dotfile_mod.update_dotfile_injection_clients(
+        dotfile=dotfile, client_script=Path("scripts/b.gml"), dependencies=[]
+    )
+    dotfile_mod.update_dotfile_injection_clients(
+        dotfile=dotfile,
+        client_script=Path("scripts/c.gml"),
+        dependencies=[Path("inject/x.gml")],
+    )
+
+    assert dotfile_mod.get_clients_for_injection(
+        dotfile=dotfile, injection_script=Path("inject/x.gml")
+    ) == [Path("scripts/c.gml")]
+    assert dotfile_mod.get_clients_for_injection(
+        dotfile=dotfile, injection_script=Path("inject/y.gml")
+    ) == [Path("scripts/a.gml")]
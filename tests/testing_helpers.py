@@ -89,8 +89,9 @@ TEST_LATER_DATETIME_STRING = "2019-12-05*10:31:20"
 TEST_ANIM_NAME = Path("nair.aseprite")
 
 
-def make_time(time_str=TEST_DATETIME_STRING):
-    return datetime.datetime.fromisoformat(time_str)
+def make_time(time_str=TEST_DATETIME_STRING) -> int:
+    """Nanoseconds since the epoch, like os.stat's st_mtime_ns."""
+    return int(datetime.datetime.fromisoformat(time_str).timestamp()) * 1_000_000_000
 
 
 def make_aseprite(